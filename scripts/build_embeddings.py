@@ -3,7 +3,8 @@ from sentence_transformers import SentenceTransformer
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 RAD_PATH = ROOT / "data" / "radicals_214.json"
-EMB_NPY  = ROOT / "data" / "radicals_embeds.npy"
+EMB_I8_NPY    = ROOT / "data" / "radicals_embeds_i8.npy"
+EMB_SCALE_NPY = ROOT / "data" / "radicals_embeds_scale.npy"
 IDX_JSON = ROOT / "data" / "radicals_index.json"
 
 def text_for(item):
@@ -13,16 +14,25 @@ def text_for(item):
     # tiny description helps the model
     return f"radical {item['id']} ({item['pinyin']}), meaning: {gloss}. related: {tags}"
 
+def quantize(X):
+    # symmetric int8 with one scale per row: X ≈ Xq * scale
+    scale = np.max(np.abs(X), axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(X / scale).astype(np.int8), scale.astype(np.float32)
+
 def main():
     model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
     items = json.loads(RAD_PATH.read_text(encoding="utf-8"))
     corpus = [text_for(it) for it in items]
-    X = model.encode(corpus, normalize_embeddings=True)
-    np.save(EMB_NPY, X.astype("float32"))
+    # all 214 radicals in a single forward pass
+    X = model.encode(corpus, batch_size=256, normalize_embeddings=True, convert_to_numpy=True)
+    Xq, scale = quantize(X)
+    np.save(EMB_I8_NPY, Xq)
+    np.save(EMB_SCALE_NPY, scale)
     # save a slim index to re-map rows → radical
     index = [{"num":it["num"], "id":it["id"], "pinyin":it["pinyin"], "gloss":it["gloss"]} for it in items]
     IDX_JSON.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"✅ Saved {len(items)} embeddings to {EMB_NPY} and index to {IDX_JSON}")
+    print(f"✅ Saved {len(items)} embeddings to {EMB_I8_NPY} (+ scales) and index to {IDX_JSON}")
 
 if __name__ == "__main__":
     main()
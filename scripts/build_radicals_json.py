@@ -1,7 +1,7 @@
 # scripts/build_radicals_json.py
 # Pull a vetted 214-radical list and normalize to our schema.
 
-import json, re, pathlib, urllib.request
+import gzip, json, re, pathlib, urllib.request
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 OUT  = ROOT / "data" / "radicals_214.json"
@@ -34,8 +34,12 @@ SYN = {
 }
 
 def fetch_json(url: str):
-    with urllib.request.urlopen(url) as r:
-        return json.loads(r.read().decode("utf-8"))
+    # ask for a compressed payload and decode straight from the response stream
+    req = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+    with urllib.request.urlopen(req) as r:
+        if r.headers.get("Content-Encoding") == "gzip":
+            return json.load(gzip.GzipFile(fileobj=r))
+        return json.load(r)
 
 def tokenize(s: str):
     return [w for w in re.split(r"[^a-z]+", s.lower()) if w]
@@ -1,13 +1,23 @@
 # scripts/cedict_lookup.py
 # Minimal CC-CEDICT loader: returns best Chinese matches for an English word.
 
-import re, gzip, pathlib
+import os, re, gzip, pathlib, pickle
+from itertools import chain
+import numpy as np
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 CEDICT_GZ = ROOT/"data"/"cedict_1_0_ts_utf-8_mdbg.txt.gz"
 CEDICT_TXT = ROOT/"data"/"cedict_ts.u8"
+# parsed entries + index, reused while CEDICT_TXT is unchanged (size, mtime)
+CEDICT_PKL = CEDICT_TXT.with_suffix(".pkl")
+# part of the cache key: bump whenever _parse/_build_index change what gets pickled
+_CACHE_VERSION = 1
 
-LINE_RE = re.compile(r"^(?P<trad>\S+)\s+(?P<simp>\S+)\s+\[(?P<pinyin>[^\]]+)\]\s+/(?P<defs>.+)/$")
+# "TRAD SIMP [pin1 yin1] /def/def/" over the whole file: skips "#" lines, never crosses "\n"
+ENTRY_RE = re.compile(
+    r"^(?!#)[^\S\n]*(\S+)[^\S\n]+(\S+)[^\S\n]+\[([^\]\n]+)\][^\S\n]+/(.+)/[^\S\n]*$", re.M)
+# same notion of "word" as the \b boundaries used when scoring
+TOKEN_RE = re.compile(r"\w+")
 
 def _ensure_txt():
     if CEDICT_TXT.exists(): return CEDICT_TXT
@@ -19,47 +29,147 @@ def _ensure_txt():
         return CEDICT_TXT
     raise FileNotFoundError("Missing CC-CEDICT. Put cedict_ts.u8 or the MDBG .gz in data/")
 
-def load_entries():
-    path = _ensure_txt()
-    entries = []
+def _column(values):
+    # 1-D object array (np.array would turn equal-length lists into a 2-D array)
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+def _parse(path):
+    """
+    CC-CEDICT as parallel columns (one object array per field): trad, simp,
+    pinyin, defs (list of glosses), defs_lower (joined, lowercased) and
+    single (bool: single-character headword).
+    """
     with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line or line.startswith("#"): continue
-            m = LINE_RE.match(line.strip())
-            if not m: continue
-            d = m.groupdict()
-            # defs: e.g. "sea/ocean/CL:..."
-            glosses = [seg for seg in d["defs"].split("/") if seg and ":" not in seg]
-            entries.append({
-                "trad": d["trad"], "simp": d["simp"], "pinyin": d["pinyin"],
-                "defs": glosses
-            })
-    return entries
+        text = f.read()
+    trad, simp, pinyin, defs = [], [], [], []
+    # one findall over the file instead of a strip + match per line
+    for t, s, p, d in ENTRY_RE.findall(text):
+        trad.append(t); simp.append(s); pinyin.append(p)
+        # defs: e.g. "sea/ocean/CL:..."
+        defs.append([seg for seg in d.split("/") if seg and ":" not in seg])
+    return {
+        "trad": _column(trad), "simp": _column(simp), "pinyin": _column(pinyin),
+        "defs": _column(defs),
+        "defs_lower": _column([" ".join(g).lower() for g in defs]),
+        "single": np.array([len(s) == 1 or len(t) == 1 for t, s in zip(trad, simp)], dtype=bool),
+    }
+
+def _build_index(cols):
+    vocab, rows, ids = {}, [], []
+    for i, text in enumerate(cols["defs_lower"]):
+        for tok in set(TOKEN_RE.findall(text)):
+            rows.append(vocab.setdefault(tok, len(vocab)))
+            ids.append(i)
+    rows = np.asarray(rows, dtype=np.int32)
+    indices = np.asarray(ids, dtype=np.int32)[np.argsort(rows, kind="stable")]
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(vocab)), out=indptr[1:])
+    return vocab, indptr, indices
+
+def _read_cache(key):
+    try:
+        with open(CEDICT_PKL, "rb") as f:
+            cached_key, data = pickle.load(f)
+    except Exception:
+        return None  # missing, truncated or from an incompatible version
+    return data if cached_key == key else None
+
+def _write_cache(key, data):
+    # write-then-rename so concurrent workers never see a partial file
+    tmp = CEDICT_PKL.with_name(f"{CEDICT_PKL.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump((key, data), f, protocol=5)
+        os.replace(tmp, CEDICT_PKL)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+def _entry(cols, i):
+    return {"trad": cols["trad"][i], "simp": cols["simp"][i],
+            "pinyin": cols["pinyin"][i], "defs": cols["defs"][i]}
+
+_INDEX = None
+def _index():
+    """
+    Entry columns + CSR inverted index over the lowercased gloss tokens.
+    Entry ids containing vocab[tok] are indices[indptr[i]:indptr[i+1]], ascending.
+    Built once per process; later processes unpickle it from CEDICT_PKL.
+    """
+    global _INDEX
+    if _INDEX is None:
+        path = _ensure_txt()
+        st = path.stat()
+        key = (_CACHE_VERSION, st.st_size, st.st_mtime_ns)
+        _INDEX = _read_cache(key)
+        if _INDEX is None:
+            cols = _parse(path)
+            _INDEX = (cols, *_build_index(cols))
+            _write_cache(key, _INDEX)
+    return _INDEX
+
+def load_entries():
+    """Parsed CC-CEDICT entries as columns (see _parse); loaded once per process."""
+    return _index()[0]
+
+def _postings(tok):
+    """Ids of entries with `tok` among their gloss tokens (a whole-word match)."""
+    _, vocab, indptr, indices = _index()
+    i = vocab.get(tok)
+    if i is None: return indices[:0]
+    return indices[indptr[i]:indptr[i + 1]]
+
+def _candidates(w):
+    """
+    Ids of entries whose defs contain `w` (the only ones that can score >= 2),
+    or None when `w` is not a single word and the index can't answer.
+    """
+    if not TOKEN_RE.fullmatch(w): return None
+    _, vocab, indptr, indices = _index()
+    # a word can only occur inside a gloss token, so union the postings of
+    # every vocabulary token that contains it
+    hits = [indices[indptr[i]:indptr[i + 1]] for tok, i in vocab.items() if w in tok]
+    if not hits: return np.empty(0, dtype=np.int32)
+    return np.unique(np.concatenate(hits))
 
 # Simple English → Chinese search
 def search_en(word: str, limit=5):
     w = (word or "").strip().lower()
     if not w: return []
-    items = load_entries()
-
-    def score(item):
-        text = " ".join(item["defs"]).lower()
-        s = 0
-        # exact word token
-        if re.search(rf"\b{re.escape(w)}\b", text): s += 5
+    cols = _index()[0]
+    single = cols["single"]
+    cand = _candidates(w)
+    if cand is None:
+        cand, rest = np.arange(len(single)), []
+        text = cols["defs_lower"]
         # substring (e.g., 'oceanic' in 'ocean')
-        if w in text: s += 2
-        # prefer single-character headwords for your demo
-        if len(item["simp"]) == 1 or len(item["trad"]) == 1: s += 1
-        return s
+        sub = np.fromiter((w in t for t in text), bool, len(text))
+        # exact word token; compiled once, and only tried where the substring is present
+        pat = re.compile(rf"\b{re.escape(w)}\b")
+        exact = np.zeros(len(text), dtype=bool)
+        for i in np.flatnonzero(sub):
+            exact[i] = pat.search(text[i]) is not None
+    else:
+        # everything else scores 0, or 1 for single-character headwords;
+        # keep the original file order within each group
+        other = np.ones(len(single), dtype=bool)
+        other[cand] = False
+        rest = chain(np.flatnonzero(other & single), np.flatnonzero(other & ~single))
+        # exact word token: membership in the entry's precomputed token set
+        exact = np.isin(cand, _postings(w), assume_unique=True)
+        # substring (e.g., 'oceanic' in 'ocean'): holds for every candidate
+        sub = np.ones(len(cand), dtype=bool)
+    # prefer single-character headwords for your demo
+    score = exact * 5 + sub * 2 + single[cand]
+    ranked = cand[np.argsort(-score, kind="stable")]
 
-    ranked = sorted(items, key=score, reverse=True)
     # dedupe by headword, keep first few
     seen, out = set(), []
-    for it in ranked:
-        key = it["simp"] + "|" + it["trad"]
+    for i in chain(ranked, rest):
+        key = cols["simp"][i] + "|" + cols["trad"][i]
         if key in seen: continue
         seen.add(key)
-        out.append(it)
+        out.append(_entry(cols, i))
         if len(out) >= limit: break
     return out
@@ -2,9 +2,11 @@
 # Usage:  python scripts/choose.py ocean 3
 # Prints the top-k radicals (default k=2) with simple explanations.
 
-import json, pathlib, re, sys
+import functools, json, pathlib, re, sys
 from collections import Counter
 
+import numpy as np
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 RAD_PATH = ROOT / "data" / "radicals_214.json"
 
@@ -52,12 +54,47 @@ def query_tokens(q: str):
         expanded += SYN.get(w, [])
     return base + expanded
 
+@functools.cache
 def load_radicals():
-    return json.loads(RAD_PATH.read_text(encoding="utf-8"))
+    items = json.loads(RAD_PATH.read_text(encoding="utf-8"))
+    for it in items:
+        # text for each radical = gloss + tags (tokenized once, not per query)
+        it["_tokset"] = frozenset(toks(it["gloss"]) + it.get("tags", []))
+    return items
+
+@functools.cache
+def token_matrix():
+    """
+    vocab: token -> column, and M: bool (n_radicals, n_tokens) with
+    M[i, vocab[t]] = radical i has t in its gloss/tags.
+    """
+    items = load_radicals()
+    vocab = {}
+    for it in items:
+        for t in sorted(it["_tokset"]):
+            vocab.setdefault(t, len(vocab))
+    M = np.zeros((len(items), len(vocab)), dtype=bool)
+    for i, it in enumerate(items):
+        M[i, [vocab[t] for t in it["_tokset"]]] = True
+    return vocab, M
+
+def scores(q_tokens):
+    """score_and_explain's score for every radical at once (exact*3 + substring)."""
+    vocab, M = token_matrix()
+    # exact: one column per query token (repeats count again, like the hits list)
+    hits = M[:, [vocab[t] for t in q_tokens if t in vocab]].sum(axis=1)
+    # substring: radical has a token related to t, but not t itself
+    subs = np.zeros(M.shape[0], dtype=np.int64)
+    for t in set(q_tokens):
+        related = [j for x, j in vocab.items() if t in x or x in t]
+        fuzzy = M[:, related].any(axis=1)
+        if t in vocab:
+            fuzzy &= ~M[:, vocab[t]]
+        subs += fuzzy
+    return hits * 3 + subs
 
 def score_and_explain(q_tokens, item):
-    # text for each radical = gloss + tags
-    text_tokens = set(toks(item["gloss"]) + item.get("tags", []))
+    text_tokens = item["_tokset"]
     hits = [t for t in q_tokens if t in text_tokens]
     # score = exact token matches + small bonus for substring matches
     substr_hits = []
@@ -71,12 +108,13 @@ def score_and_explain(q_tokens, item):
 def choose(word: str, k: int = 2):
     items = load_radicals()
     q_tokens = query_tokens(word)
-    ranked = []
-    for it in items:
-        sc, hits, subs = score_and_explain(q_tokens, it)
-        ranked.append((sc, hits, subs, it))
-    ranked.sort(key=lambda x: x[0], reverse=True)
-    top = [r for r in ranked if r[0] > 0][:k] or ranked[:k]  # fallback to top arbitrary
+    sc = scores(q_tokens)
+    order = np.argsort(-sc, kind="stable")  # ties keep radical order
+    top = order[sc[order] > 0][:k]
+    if not len(top):
+        top = order[:k]  # fallback to top arbitrary
+    # explanations only for the few radicals we return
+    top = [(*score_and_explain(q_tokens, items[i]), items[i]) for i in top]
     result = []
     for sc, hits, subs, it in top:
         result.append({
@@ -1,8 +1,14 @@
-import json, pathlib, numpy as np
+import functools, json, pathlib, numpy as np
 from sentence_transformers import SentenceTransformer
 
+try:
+    import simsimd  # SIMD dot products; optional, NumPy fallback below
+except ImportError:
+    simsimd = None
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
-EMB_NPY  = ROOT / "data" / "radicals_embeds.npy"
+EMB_I8_NPY    = ROOT / "data" / "radicals_embeds_i8.npy"
+EMB_SCALE_NPY = ROOT / "data" / "radicals_embeds_scale.npy"
 IDX_JSON = ROOT / "data" / "radicals_index.json"
 
 # tiny, human-readable trace for "why"
@@ -22,12 +28,58 @@ def model():
         _model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
     return _model
 
+@functools.lru_cache(maxsize=4096)
+def _encode_cached(key: str):
+    v = model().encode([key], normalize_embeddings=True)[0].astype(np.float32)
+    v.setflags(write=False)  # shared between callers via the cache
+    return v
+
+def _encode(word: str):
+    """Normalized query vector; the MiniLM tokenizer is uncased, so key on lowercase."""
+    return _encode_cached(word.strip().lower())
+
+_XQ = None
+_SCALE = None
+_IDX = None
+_XF = None  # dequantized float32 copy, only without simsimd
+def _load():
+    """int8 embedding matrix (memory-mapped), per-row scales + row index, read once per process."""
+    global _XQ, _SCALE, _IDX, _XF
+    if _XQ is None:
+        _XQ = np.load(EMB_I8_NPY, mmap_mode="r")
+        _SCALE = np.load(EMB_SCALE_NPY)[:, 0]
+        _IDX = json.loads(pathlib.Path(IDX_JSON).read_text(encoding="utf-8"))
+        if simsimd is None:
+            # converted once: NumPy has no int8 BLAS, and widening the matrix
+            # per query cost ~10x more than this fp32 product
+            _XF = np.asarray(_XQ, dtype=np.float32) * _SCALE[:, None]
+    return _XQ, _SCALE, _IDX
+
+def quantize(v):
+    """Symmetric int8 quantization of a single vector (same scheme as build_embeddings)."""
+    s = float(np.max(np.abs(v))) / 127.0 or 1.0
+    return np.round(v / s).astype(np.int8), s
+
+def similarities(Xq, scale, qv):
+    """
+    Cosine similarity of every radical with qv (both are L2-normalized, so dot == cosine).
+    Without simsimd this uses the float32 matrix _load() dequantized once.
+    """
+    if simsimd is None:
+        return _XF @ qv
+    qq, qs = quantize(qv)
+    dots = np.asarray(simsimd.cdist(qq[None, :], Xq, metric="dot"))[0]
+    return dots * scale * qs
+
 def choose(word: str, k: int = 2):
-    X = np.load(EMB_NPY)
-    idx = json.loads(pathlib.Path(IDX_JSON).read_text(encoding="utf-8"))
-    qv = model().encode([word], normalize_embeddings=True)[0]
-    sims = (X @ qv)  # cosine since both normalized
-    order = np.argsort(-sims)[:k]
+    Xq, scale, idx = _load()
+    qv = _encode(word)
+    sims = similarities(Xq, scale, qv)
+    k = max(0, min(k, sims.shape[0]))
+    if k == 0:
+        return []
+    part = np.argpartition(sims, -k)[-k:]  # unordered top-k, O(N)
+    order = part[np.argsort(-sims[part])]
     picks = []
     for i, j in enumerate(order, 1):
         it = idx[j]